@@ -0,0 +1,43 @@
+import the_snake
+
+
+def _crashed_snake():
+    snake = the_snake.SnakeInternal(
+        the_snake.screen, the_snake.GRID_SIZE, (100, 100)
+    )
+    for _ in range(4):
+        snake.increase()
+        assert not snake.move()
+    for direction in (the_snake.DOWN, the_snake.LEFT):
+        snake.update_direction(direction)
+        assert not snake.move()
+    snake.update_direction(the_snake.UP)
+    assert snake.move(), (
+        'Убедитесь, что метод `move` возвращает `True`, когда голова '
+        'змейки врезается в её тело.'
+    )
+    return snake
+
+
+def test_snake_head_after_crash():
+    snake = _crashed_snake()
+    assert snake.get_head_position() == (160, 100), (
+        'Убедитесь, что после столкновения голова змейки находится в '
+        'клетке, в которую она врезалась.'
+    )
+    assert snake.length == 5, (
+        'Убедитесь, что столкновение не меняет длину змейки.'
+    )
+
+
+def test_snake_reset_after_crash():
+    snake = _crashed_snake()
+    snake.reset()
+    assert snake.get_head_position() == (160, 100), (
+        'Убедитесь, что после сброса змейка продолжает с клетки, в которую '
+        'она врезалась.'
+    )
+    assert snake.length == 1, (
+        'Убедитесь, что после сброса длина змейки равна 1.'
+    )
+    assert snake.direction == the_snake.START_SNAKE_DIRECTION
@@ -1,6 +1,7 @@
-from random import randint
+from random import choice, randrange
 from abc import ABC, abstractmethod
-from typing import Tuple, List, Set, Optional
+from collections import deque
+from typing import Deque, Tuple, List, Optional, Sequence
 from pygame.color import Color
 
 import pygame
@@ -12,6 +13,9 @@ GRID_WIDTH = SCREEN_WIDTH // GRID_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // GRID_SIZE
 START_APPLE_POSITION = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
 START_SNAKE_POSITION = (SCREEN_WIDTH // 4, SCREEN_HEIGHT // 4)
+# Все клетки игрового поля
+ALL_CELLS = tuple((x * GRID_SIZE, y * GRID_SIZE)
+                  for x in range(GRID_WIDTH) for y in range(GRID_HEIGHT))
 
 
 # Направления движения
@@ -20,6 +24,20 @@ DOWN = (0, 1)
 LEFT = (-1, 0)
 RIGHT = (1, 0)
 START_SNAKE_DIRECTION = RIGHT
+# Противоположные направления, разворот в которые запрещён
+OPPOSITES = {UP: DOWN, DOWN: UP, LEFT: RIGHT, RIGHT: LEFT}
+
+# Константы pygame, связанные один раз для обработки событий
+_QUIT = pygame.QUIT
+_KEYDOWN = pygame.KEYDOWN
+
+# Направление движения для клавиш-стрелок
+KEY_DIR = {
+    pygame.K_UP: UP,
+    pygame.K_DOWN: DOWN,
+    pygame.K_LEFT: LEFT,
+    pygame.K_RIGHT: RIGHT,
+}
 
 # Цвета фона - черный
 BOARD_BACKGROUND_COLOR = (0, 0, 0)
@@ -27,6 +45,9 @@ BOARD_BACKGROUND_COLOR = (0, 0, 0)
 # Скорость движения змейки
 SPEED = 3
 
+# Событие таймера, по которому удав делает шаг
+MOVE_EVENT = pygame.USEREVENT + 1
+
 
 class GameObjectInternal(ABC):
     """
@@ -40,6 +61,11 @@ class GameObjectInternal(ABC):
         self._position = position
         self._surface = surface
         self._size = size
+        # закэшированная клетка фона для затирания сегментов
+        self._bg_tile = self._make_tile(BOARD_BACKGROUND_COLOR)
+        # переиспользуемая область клетки объекта, чтобы не создавать
+        # новый Rect при каждой отрисовке
+        self._rect = pygame.Rect(position, (size, size))
 
     @property
     @abstractmethod
@@ -54,20 +80,27 @@ class GameObjectInternal(ABC):
         ...
 
     @abstractmethod
-    def draw(self) -> None:
-        """Отрисовка объекта по _position в _surface"""
-        pass
+    def draw(self) -> List[pygame.Rect]:
+        """Отрисовка объекта по _position в _surface
 
-    def draw_atom(self, point, color, border_color) -> None:
-        """Хелпер для отрисовки одного сегмента с рамкой"""
-        rect = pygame.Rect(point[0], point[1], self.size, self.size)
-        pygame.draw.rect(self.surface, color, rect)
-        pygame.draw.rect(self.surface, border_color, rect, 1)
+        Returns: список изменённых областей для pygame.display.update.
+        """
+        pass
 
     def erase_atom(self, point) -> None:
         """Хелпер для удаления сегмента"""
-        rect = pygame.Rect(point[0], point[1], self.size, self.size)
-        pygame.draw.rect(self.surface, BOARD_BACKGROUND_COLOR, rect)
+        self.surface.blit(self._bg_tile, point)
+
+    def _make_tile(self, color, border_color=None) -> pygame.Surface:
+        """Хелпер для предварительной отрисовки сегмента в отдельную
+        поверхность, которая потом только копируется через blit
+        """
+        tile = pygame.Surface((self._size, self._size))
+        tile.fill(color)
+        if border_color is not None:
+            pygame.draw.rect(tile, border_color, tile.get_rect(), 1)
+        # формат пикселей совпадает с экраном, blit идёт без конвертации
+        return tile.convert()
 
     @property
     def position(self) -> Tuple[int, int]:
@@ -97,6 +130,10 @@ class AppleInternal(GameObjectInternal):
 
         super().__init__(surface, size, position)
         self._color = Color(255, 0, 0)
+        # тот же цвет простым кортежем RGB для отрисовки
+        self._color_rgb = (255, 0, 0)
+        self._tile = self._make_tile(self._color_rgb,
+                                     AppleInternal.BORDER_COLOR)
 
     @property
     def body_color(self) -> Color:
@@ -107,22 +144,33 @@ class AppleInternal(GameObjectInternal):
     def body_color(self, val: Color):
         """Цвет яблока: setter"""
         self._color = val
+        self._color_rgb = (val.r, val.g, val.b)
+        self._tile = self._make_tile(self._color_rgb,
+                                     AppleInternal.BORDER_COLOR)
 
-    def draw(self) -> None:
+    def draw(self) -> List[pygame.Rect]:
         """Отрисовка яблока"""
-        super().draw_atom(super().position, self.body_color,
-                          AppleInternal.BORDER_COLOR)
+        self._rect.topleft = self._position
+        self._surface.blit(self._tile, self._position)
+        return [self._rect]
+
+    def randomize_position(
+            self, free_cells: Optional[Sequence[Tuple[int, int]]] = None
+    ) -> Tuple[int, int]:
+        """Расположение яблока на плоскости. Если переданы свободные клетки,
+        то позиция выбирается среди них за один вызов
+        """
+        if free_cells is not None:
+            if free_cells:
+                self._position = choice(free_cells)
+            return self._position
 
-    def randomize_position(self) -> Tuple[int, int]:
-        """Расположение яблока на плоскости"""
+        # координаты выбираются сразу в клетках сетки, без округления,
+        # одним вызовом генератора на номер клетки
         last_pos = self._position
         while last_pos == self._position:
-            x = randint(0, self.surface.get_width() - self._size)
-            y = randint(0, self.surface.get_height() - self._size)
-            self._position = (
-                x - x % self._size,
-                y - y % self._size
-            )
+            x, y = divmod(randrange(GRID_WIDTH * GRID_HEIGHT), GRID_HEIGHT)
+            self._position = (x * self._size, y * self._size)
 
         return self._position
 
@@ -143,15 +191,27 @@ class SnakeInternal(GameObjectInternal):
 
         self._color = Color(0, 240, 0)
         self._color_head = Color(0, 255, 0)
+        # те же цвета простыми кортежами RGB для отрисовки
+        self._color_rgb = (0, 240, 0)
+        self._color_head_rgb = (0, 255, 0)
+        self._body_tile = self._make_tile(self._color_rgb,
+                                          SnakeInternal.BORDER_COLOR)
+        self._head_tile = self._make_tile(self._color_head_rgb,
+                                          SnakeInternal.BORDER_COLOR)
+        # области затёртого хвоста и бывшей головы для draw
+        self._tail_rect = pygame.Rect(position, (size, size))
+        self._neck_rect = pygame.Rect(position, (size, size))
         # ставится в move на удаляемый хвост
         self._last: Optional[Tuple[int, int]] = None
-        self._positions: List[Tuple[int, int]] = []
+        # deque даёт O(1) вставку в голову и удаление хвоста
+        self._positions: Deque[Tuple[int, int]] = deque()
         self._direction: Tuple[int, int] = START_SNAKE_DIRECTION
         self.next_direction: Optional[Tuple[int, int]] = None
         self._increase: bool = False
         # нужно, чтобы быстро определять попадание яблока в тело
-        # # или головы в тело за O(1)
-        self._tail_cache: Set[Tuple[int, int]] = set()
+        # # или головы в тело за O(1): по байту на клетку поля, клетки
+        # # нумеруются так же, как в ALL_CELLS
+        self._occ = bytearray(GRID_WIDTH * GRID_HEIGHT)
 
     @property
     def length(self) -> int:
@@ -172,40 +232,66 @@ class SnakeInternal(GameObjectInternal):
     def body_color(self, val: Color):
         """Устанавливает цвет удава"""
         self._color = val
+        self._color_rgb = (val.r, val.g, val.b)
+        self._body_tile = self._make_tile(self._color_rgb,
+                                          SnakeInternal.BORDER_COLOR)
 
     def update_direction(self, next_direction):
         """Меняет направление движения удава"""
         self.next_direction = next_direction
 
     def move(self) -> bool:
-        """Выполняет шаг перемещения удава"""
+        """Выполняет шаг перемещения удава
+
+        Returns: True, если голова врезалась в тело. В этом случае
+            сдвигается только голова, тело не меняется, так как дальше
+            всё равно следует reset.
+        """
         self._direction = (self._direction
                            if self.next_direction
                            is None else self.next_direction)
         self.next_direction = None
 
+        head = self._position
+        positions = self._positions
+        occ = self._occ
+        next_head = self._get_next_head()
+        # столкновение редкое, поэтому проверяется до изменения тела;
+        # клетка уходящего хвоста столкновением не считается
+        if occ[self._idx(next_head)] and (self._increase
+                                          or next_head != positions[-1]):
+            # бывшая голова не попала в тело, её затрёт reset
+            self._last = head
+            self._position = next_head
+            return True
+
         if self._increase is False:
-            if len(self._positions) > 0:
+            if positions:
                 # хвост, который будет удалён при перерисовке (_erase_last)
-                self._last = self._positions.pop()
-                self._tail_cache.remove(self._last)
-                self._positions.insert(0, super().position)
-                self._tail_cache.add(super().position)
+                self._last = positions.pop()
+                occ[self._idx(self._last)] = 0
+                positions.appendleft(head)
+                occ[self._idx(head)] = 1
             else:
                 # хвост, который будет удалён при перерисовке (_erase_last)
-                self._last = self.position
+                self._last = head
         else:
-            self._positions.insert(0, super().position)
-            self._tail_cache.add(super().position)
+            positions.appendleft(head)
+            occ[self._idx(head)] = 1
             self._increase = False
 
-        self._position = self._get_next_head()
+        self._position = next_head
 
-        return self.is_point_in_snake(self._position)
+        return False
 
     def is_point_in_snake(self, point: Tuple[int, int]) -> bool:
         """Проверяет попадание точки в тело удава"""
-        return point in self._tail_cache
+        return bool(self._occ[self._idx(point)])
+
+    def free_cells(self) -> List[Tuple[int, int]]:
+        """Возвращает клетки поля, не занятые удавом"""
+        return [pt for pt, busy in zip(ALL_CELLS, self._occ)
+                if not busy and pt != self._position]
 
     def increase(self):
         """Помечает удава, как готового к росту на 1 сегмент при
@@ -213,16 +299,42 @@ class SnakeInternal(GameObjectInternal):
         """
         self._increase = True
 
-    def draw(self) -> None:
-        """Отображает удава на двумерной плоскости"""
-        super().draw_atom(super().position, self.body_color,
-                          SnakeInternal.BORDER_COLOR)
-
-        for position in self._positions[::-1]:
-            super().draw_atom(position, self.body_color,
-                              SnakeInternal.BORDER_COLOR)
+    def draw(self) -> List[pygame.Rect]:
+        """Дорисовывает удава после шага перемещения: за шаг меняются
+        не более трёх клеток - затёртый хвост, бывшая голова, ставшая телом,
+        и новая голова.
 
+        Returns: список изменённых областей для pygame.display.update.
+        """
+        head = self._position
+        positions = self._positions
+        dirty = []
+        # хвост затирается первым, так как голова могла встать на его место
+        tiles = []
+        last = self._erase_last(tiles)
+        if last is not None:
+            self._tail_rect.topleft = last
+            dirty.append(self._tail_rect)
+        if positions:
+            self._neck_rect.topleft = positions[0]
+            tiles.append((self._body_tile, positions[0]))
+            dirty.append(self._neck_rect)
+        self._rect.topleft = head
+        tiles.append((self._head_tile, head))
+        dirty.append(self._rect)
+        self._surface.blits(tiles, doreturn=0)
+
+        return dirty
+
+    def redraw(self) -> None:
+        """Полностью отображает удава на двумерной плоскости"""
+        # весь удав копируется одним вызовом blits вместо пары
+        # draw.rect на каждый сегмент
         self._erase_last()
+        body = self._body_tile
+        self._surface.blits(((body, pt) for pt in reversed(self._positions)),
+                            doreturn=0)
+        self._surface.blit(self._head_tile, self._position)
 
     def get_head_position(self):
         """Возвращает голову удава"""
@@ -235,73 +347,67 @@ class SnakeInternal(GameObjectInternal):
             super().erase_atom(pt)
         super().erase_atom(super().position)
 
-        self._positions = []
+        self._positions = deque()
         self._direction = START_SNAKE_DIRECTION
         self.next_direction = None
-        self._tail_cache.clear()
+        self._increase = False
+        self._occ = bytearray(GRID_WIDTH * GRID_HEIGHT)
 
     def _get_next_head(self) -> Tuple[int, int]:
         """Вычисляет координаты следующей готовы удава при шаге перемещения"""
-        x = super().position[0] + self._direction[0] * self.size
-        y = super().position[1] + self._direction[1] * self.size
-        if (x < 0):
-            x = SCREEN_WIDTH - self.size
-        if (x > SCREEN_WIDTH - self.size):
-            x = 0
-        if (y < 0):
-            y = SCREEN_HEIGHT - self.size
-        if (y > SCREEN_HEIGHT - self.size):
-            y = 0
-
-        return (x, y)
-
-    def _erase_last(self):
-        """Скрывает остаток хвоста удава"""
-        if self._last is not None:  # затирание last
-            super().erase_atom(self._last)
+        size = self._size
+        x, y = self._position
+        dx, dy = self._direction
+        # выход за край поля заворачивается остатком от деления
+        return ((x + dx * size) % SCREEN_WIDTH,
+                (y + dy * size) % SCREEN_HEIGHT)
+
+    def _idx(self, point: Tuple[int, int]) -> int:
+        """Возвращает номер клетки поля в _occ"""
+        return (point[0] // self._size) * GRID_HEIGHT + point[1] // self._size
+
+    def _erase_last(
+            self, tiles: Optional[List[Tuple[pygame.Surface,
+                                             Tuple[int, int]]]] = None
+    ) -> Optional[Tuple[int, int]]:
+        """Скрывает остаток хвоста удава. Если передан список tiles, то
+        затирание добавляется в него для общего вызова blits.
+
+        Returns: затёртая клетка или None, если затирать было нечего.
+        """
+        last = self._last
+        if last is not None:  # затирание last
+            if tiles is None:
+                super().erase_atom(last)
+            else:
+                tiles.append((self._bg_tile, last))
             self._last = None
+        return last
 
 
 # Тут опишите все классы игры
 class GameController:
     """Представляет логику игры"""
 
-    def __init__(self, game_object, snake, apple):
+    def __init__(self, snake, apple):
         self.snake = snake
         self.apple = apple
-        self.game_object = game_object
 
-    def handle_keys(self) -> bool:
+    def handle_keys(self, event: pygame.event.Event) -> bool:
         """
         Тут процессится нажатая клавиша-стрелка и событие завершения игры
 
-        Returns: True, если нажата клавиша и False, если был сигнал выхода
+        Returns: True, если игра продолжается и False, если был сигнал выхода
             из игры.
         """
-        for event in self.game_object.event.get():
-            if event.type == self.game_object.QUIT:
-                return False
-
-            if event.type == self.game_object.KEYDOWN:
-                if (event.key == self.game_object.K_UP
-                        and self.snake.direction != DOWN):
-
-                    self.snake.update_direction(UP)
-
-                elif (event.key == self.game_object.K_DOWN
-                      and self.snake.direction != UP):
-
-                    self.snake.update_direction(DOWN)
-
-                elif (event.key == self.game_object.K_LEFT
-                      and self.snake.direction != RIGHT):
-
-                    self.snake.update_direction(LEFT)
-
-                elif (event.key == self.game_object.K_RIGHT
-                      and self.snake.direction != LEFT):
-
-                    self.snake.update_direction(RIGHT)
+        if event.type == _QUIT:
+            return False
+
+        if event.type == _KEYDOWN:
+            new_dir = KEY_DIR.get(event.key)
+            if (new_dir is not None
+                    and OPPOSITES[new_dir] != self.snake.direction):
+                self.snake.update_direction(new_dir)
         return True
 
     def validate_snake_head(self) -> None:
@@ -314,11 +420,12 @@ class GameController:
 
     def randomize_apple(self) -> None:
         """Кидает яблоко на плоскость"""
-        while True:
-            point = self.apple.randomize_position()
-            # яблоко не должно попасть на питона
-            if not self.snake.is_point_in_snake(point):
-                break
+        # яблоко не должно попасть на питона и остаться на прежнем месте,
+        # поэтому выбираем сразу из свободных клеток без повторных попыток
+        free = self.snake.free_cells()
+        if self.apple.position in free:
+            free.remove(self.apple.position)
+        self.apple.randomize_position(free)
 
 
 # Инициализация PyGame
@@ -338,27 +445,39 @@ def main():
     """Точка входа игры"""
     apple = AppleInternal(screen, GRID_SIZE, START_APPLE_POSITION)
     snake = SnakeInternal(screen, GRID_SIZE, START_SNAKE_POSITION)
-    controller = GameController(pygame, snake, apple)
+    controller = GameController(snake, apple)
 
     apple.draw()
-    snake.draw()
+    snake.redraw()
     pygame.display.update()
 
+    # шаги удава идут по таймеру, а клавиши обрабатываются сразу
+    pygame.time.set_timer(MOVE_EVENT, 1000 // SPEED)
+
     while True:
-        clock.tick(SPEED)
-        if not controller.handle_keys():
+        clock.tick()
+        # ждём очередное событие, не нагружая процессор между шагами
+        event = pygame.event.wait()
+        if not controller.handle_keys(event):
             break
+        if event.type != MOVE_EVENT:
+            continue
+
         if snake.move():
             # произошло пересечение головы с телом питона
             snake.reset()
             apple.erase()
             controller.randomize_apple()
-        else:
-            # проверяем съедание яблока
-            controller.validate_snake_head()
-        apple.draw()
-        snake.draw()
-        pygame.display.update()
+            apple.draw()
+            snake.redraw()
+            # после сброса перерисовывается весь экран
+            pygame.display.update()
+            continue
+
+        # проверяем съедание яблока
+        controller.validate_snake_head()
+        # обновляются только изменившиеся за шаг клетки
+        pygame.display.update(snake.draw() + apple.draw())
 
     pygame.quit()
 